@@ -11,30 +11,252 @@ This module defines:
 ```class EasySSLSendmail```
   
 Class for sending out eMails using an SMTP connection over SSL
+
+```class PreparedMessage```
+
+Message template for sending the same mail to many recipients
+
+```class EasySSLSendmailPool```
+
+Pool of EasySSLSendmail connections for concurrent sending
+
+```class AsyncEasySSLSendmail```
+
+asyncio variant of EasySSLSendmail (requires aiosmtplib, extra "async")
 """
 
 from __future__ import annotations
 
-import json, smtplib, ssl, logging
-from datetime import datetime, timezone
+import collections
+import copy
+import functools
+import json
+import logging
+import os
+import re
+import smtplib
+import ssl
+import threading
+import time
+from io import BytesIO
 
-# simple textmessage and multipart message
+# message classes (already loaded by smtplib); email.policy is imported
+# on demand by _smtp_policy(), since it pulls in the header parser
+from email.generator import BytesGenerator
 from email.message import EmailMessage
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from email.utils import getaddresses
 
-from typing import TYPE_CHECKING 
+from typing import TYPE_CHECKING, Any, Iterable
 if TYPE_CHECKING: 
     from _typeshed import FileDescriptorOrPath as FileDescriptorOrPath
+    from email.policy import EmailPolicy
+    import queue
+    import aiosmtplib
 
 logger = logging.getLogger(__name__)
 
-class EasySSLSendmail(smtplib.SMTP_SSL):
+# use orjson for reading credential files, if installed (extra "orjson")
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+_DEFAULT_CTX: ssl.SSLContext|None = None
+""" default SSL context shared by all instances created without ssl_context """
+
+@functools.lru_cache(maxsize=16)
+def _load_creds_cached(path: str|bytes, mtime_ns: int, size: int,
+                       ino: int) -> tuple[tuple[str, Any], ...]:
+    """ Read credentials from a JSON file and return them as a tuple of items.
+    path should be absolute. mtime_ns, size and ino are only part of the cache
+    key, so that a modified or replaced file is read again.
+    """
+    with open(path, "rb") as fp:
+        return tuple(_json_loads(fp.read()).items())
+
+@functools.lru_cache(maxsize=2)
+def _smtp_policy(utf8: bool = False) -> EmailPolicy:
+    """ Return email.policy.SMTP (or its utf8 variant). email.policy is
+    imported on first call, since it pulls in the header parser.
+    """
+    from email.policy import SMTP
+    return SMTP.clone(utf8=True) if utf8 else SMTP
+
+def _envelope_policy(addrs: Iterable[str]) -> tuple[EmailPolicy, list[str]]:
+    """ Return policy and mail options for sending to/from the given envelope
+    addresses. If an address contains non-ASCII characters, the utf8 policy
+    and the mail options SMTPUTF8 and BODY=8BITMIME are returned (like
+    smtplib.SMTP.send_message() does), the plain SMTP policy and no options
+    otherwise.
+    """
+    if all(addr.isascii() for addr in addrs):
+        return _smtp_policy(), []
+    return _smtp_policy(utf8=True), ["SMTPUTF8", "BODY=8BITMIME"]
+
+def _default_ssl_context() -> ssl.SSLContext:
+    """ Return the shared default SSL context, create it on first call.
+    """
+    global _DEFAULT_CTX
+    if _DEFAULT_CTX is None:
+        _DEFAULT_CTX = ssl.create_default_context()
+    return _DEFAULT_CTX
+
+class _SendmailCommon:
+    """Minpause check and message creation shared by EasySSLSendmail
+    and AsyncEasySSLSendmail.
+    """
+
+    MINPAUSE_BURST = 1
+    """ number of mails that may be sent in a row before minpause applies """
+
+    __slots__ = ("_host", "_port", "_user", "_password", "_sender", "_minpause",
+                 "_tokens", "_last_refill", "_login_args")
+
+    def _set_credentials(self, credentials: dict) -> None:
+        """ Store the values of a dict created by make_credentials_dict().
+        """
+        self._host: str = credentials["host"]
+        self._port: int = credentials["port"]
+        self._user: str|None = credentials.get("user")
+        self._password: str|None = credentials.get("password")
+        self._sender: str|None = credentials.get("sender")
+        self._minpause: int|None = credentials.get("minpause")
+        # login arguments, remembered to re-login after a reconnect
+        self._login_args: tuple[str, str]|None = None
+
+    def _init_minpause(self) -> None:
+        """ Fill the token bucket for the minpause check (first mail shall be sent out any way).
+        """
+        self._tokens: float = self.MINPAUSE_BURST
+        self._last_refill: float = time.monotonic()
+
+    def _effective_minpause(self, minpause: int|None) -> float|None:
+        """ Get the minpause which applies to a call, None if there is none.
+        """
+        if minpause is None:
+            minpause = self._minpause
+        if isinstance(minpause, (int, float)) and minpause > 0:
+            return minpause
+        return None
+
+    def _minpause_reserve(self, minpause: int|None) -> bool:
+        """ Refill the token bucket and check if a mail may be sent now.
+        If so, a token is taken right away, so that concurrent calls cannot
+        use the same token. If not, a warning is logged.
+        Calls without a minpause do not touch the bucket at all.
+
+        Args:
+            minpause (int | None): see send_mail_message()
+
+        Returns:
+            bool: True if the mail may be sent
+        """
+        minpause = self._effective_minpause(minpause)
+        if minpause is None:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self.MINPAUSE_BURST,
+                           self._tokens + (now - self._last_refill) / minpause)
+        self._last_refill = now
+        if self._tokens < 1:
+            # if mail is suppressed, log warning
+            logger.warning("minpause of %s s prevents mail from being sent. "
+                           "next mail possible in %.1f s",
+                           minpause, (1 - self._tokens) * minpause)
+            return False
+        self._tokens -= 1
+        return True
+
+    def _minpause_release(self, minpause: int|None) -> None:
+        """ Give back a token taken by _minpause_reserve() for a mail
+        which could not be sent.
+
+        Args:
+            minpause (int | None): same value as passed to _minpause_reserve()
+        """
+        if self._effective_minpause(minpause) is not None:
+            self._tokens = min(self.MINPAUSE_BURST, self._tokens + 1)
+
+    def _resolve_login(self, user: str|None, password: str|None) -> tuple[str, str]:
+        """ Return user and password or, if None, the values from the
+        credentials dict (or "" with a warning, if not found there either).
+        """
+        if user is None:
+            user = self._user
+            if user is None:
+                logger.warning("username neither passed as argument "
+                               "nor found in credentials dict -> using empty string")
+                user = ""
+        if password is None:
+            password = self._password
+            if password is None:
+                logger.warning("password neither passed as argument "
+                               "nor found in credentials dict -> using empty string")
+                password = ""
+        return user, password
+
+    def _resolve_sender(self, sender: str|None) -> str:
+        """ Return sender or, if None, the sender from the credentials dict.
+        """
+        if sender is None:
+            sender = self._sender
+            if sender is None:
+                logger.warning("sender address neither passed as argument "
+                               "nor found in credentials dict!")
+                sender = "(unknown sender)"
+        return sender
+
+    @staticmethod
+    def _group_by_domain(messages: Iterable[dict]) -> list[tuple[int, dict]]:
+        """ Order messages by the domain of their (first) mail_to address,
+        keeping the input order within a domain.
+
+        Returns:
+            list: tuples of input position and message
+        """
+        buckets: dict[str, list[tuple[int, dict]]] = collections.defaultdict(list)
+        for pos, message in enumerate(messages):
+            addr = getaddresses([message["mail_to"]])[0][1]
+            buckets[addr.rpartition("@")[2].lower()].append((pos, message))
+        return [entry for bucket in buckets.values() for entry in bucket]
+
+    @staticmethod
+    def _render_message(mail_subject: str, mail_to: str, mail_text: str,
+                        mail_html: str|None, sender: str
+                        ) -> tuple[str, list[str], bytes, list[str]]:
+        """ Create a text or multipart message, see send_mail_message().
+        Policy and mail options depend on the envelope addresses, see
+        _envelope_policy().
+
+        Returns:
+            tuple: envelope sender, envelope recipients, message bytes and mail options
+        """
+        from_addr = getaddresses([sender])[0][1]
+        to_addrs = [addr for _, addr in getaddresses([mail_to])]
+        policy, mail_options = _envelope_policy([from_addr, *to_addrs])
+        msg = EmailMessage()
+        msg["Subject"] = mail_subject
+        msg["From"] = sender
+        msg["To"] = mail_to
+        msg.set_content(mail_text)
+        if isinstance(mail_html, str):
+            # add HTML part as an alternative to the text part
+            msg.add_alternative(mail_html, subtype="html")
+        return from_addr, to_addrs, msg.as_bytes(policy=policy), mail_options
+
+class EasySSLSendmail(_SendmailCommon, smtplib.SMTP_SSL):
     """Class for sending out eMails using an SMTP connection over SSL
     """
 
     SSMTP_PORT_DEFAULT = 465
     """ standard server port for SMTP oder SSL """
+
+    RECOVERABLE_EXCEPTIONS = (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused,
+                              smtplib.SMTPNotSupportedError)
+    """ exceptions after which the session is still in a defined state (smtplib
+    has sent RSET or no command of the transaction has been sent). After any
+    other exception, send_mail_message() closes the connection. """
     
     @classmethod
     def make_credentials_dict(cls, *, json_mail_info: dict|FileDescriptorOrPath|None = None,
@@ -64,36 +286,62 @@ class EasySSLSendmail(smtplib.SMTP_SSL):
         # read connection information from dict or file
         if isinstance(json_mail_info, dict):
             # create deep copy of info dict to leave the original untouched
-            credentials = json.loads(json.dumps(json_mail_info))
+            credentials = copy.deepcopy(json_mail_info)
         elif json_mail_info is not None:
             # if not dict and not None, we should have a FileDescriptorOrPath
-            with open(json_mail_info) as fp: # type: ignore
-                credentials = json.load(fp)
+            if isinstance(json_mail_info, int):
+                # file descriptors cannot be cached reliably
+                with open(json_mail_info, "rb") as fp:
+                    credentials = _json_loads(fp.read())
+            else:
+                # file contents are cached as long as the file is unchanged
+                path = os.path.abspath(json_mail_info)
+                st = os.stat(path)
+                credentials = dict(_load_creds_cached(path, st.st_mtime_ns,
+                                                      st.st_size, st.st_ino))
         else:
             # start with empty dict
             credentials = {}    
         # process argument list and eventually overwrite file/dict info
-        if host is not None:
-            credentials["host"] = host
-        if port is not None:
-            credentials["port"] = port
-        if user is not None:
-            credentials["user"] = user
-        if password is not None:
-            credentials["password"] = password
-        if sender is not None:
-            credentials["sender"] = sender
-        if minpause is not None:
-            credentials["minpause"] = minpause
+        credentials.update({key: value for key, value in (
+                                ("host", host), ("port", port),
+                                ("user", user), ("password", password),
+                                ("sender", sender), ("minpause", minpause))
+                            if value is not None})
 
         # take user for sender, if user is given, but no sender is provided
-        if "user" in credentials and not "sender" in credentials:
-            credentials["sender"] = credentials["user"]
+        known_user = credentials.get("user")
+        if known_user is not None:
+            credentials.setdefault("sender", known_user)
         # use default port, if not provided
-        if not "port" in credentials:
-            credentials["port"] = cls.SSMTP_PORT_DEFAULT
+        credentials.setdefault("port", cls.SSMTP_PORT_DEFAULT)
         return credentials
 
+    @classmethod
+    def pool(cls, size: int = 5, max_per_conn: int = 100, *,
+             json_mail_info: dict|FileDescriptorOrPath|None = None,
+             host: str|None = None, port: int|None = None, 
+             user: str|None = None, password: str|None = None,
+             sender: str|None = None, minpause: int|None = None,
+             ssl_context: ssl.SSLContext|None = None) -> EasySSLSendmailPool:
+        """ Create a pool of connections of this class, see EasySSLSendmailPool.
+
+        Args:
+            size (int, optional): number of connections. Defaults to 5.
+            max_per_conn (int, optional): number of mails after which a connection
+                                          is replaced by a new one. Defaults to 100.
+            any other: see __init__()
+
+        Returns:
+            EasySSLSendmailPool: the connection pool
+        """
+        credentials = cls.make_credentials_dict(json_mail_info=json_mail_info,
+                                    host=host, port=port, 
+                                    user=user, password=password,
+                                    sender=sender, minpause=minpause)
+        return EasySSLSendmailPool(credentials, sendmail_class=cls, size=size,
+                                   max_per_conn=max_per_conn, ssl_context=ssl_context)
+
     def __init__(self, *, json_mail_info: dict|FileDescriptorOrPath|None = None,
                  host: str|None = None, port: int|None = None, 
                  user: str|None = None, password: str|None = None,
@@ -102,27 +350,27 @@ class EasySSLSendmail(smtplib.SMTP_SSL):
         """ Create new SSL Mail server instance. 
         Calls EasySSLSendmail.make_credentials_dict to gather the needed information.
 
-        If no ssl_context ist passed (default is None), ssl.create_default_context() 
-        will be called and used as context.
+        If no ssl_context ist passed (default is None), a context created once by
+        ssl.create_default_context() and shared by all such instances will be used.
+        Pass your own context if the instance needs a separate one.
 
         Args:
             any except ssl_context: see make_credentials_dict()
             ssl_context (ssl.SSLContext, optional): Defaults to None (see above)
         """
-        self._credentials = EasySSLSendmail.make_credentials_dict(
+        self._set_credentials(EasySSLSendmail.make_credentials_dict(
                                     json_mail_info=json_mail_info,
                                     host=host, port=port, 
                                     user=user, password=password,
-                                    sender=sender, minpause=minpause)
+                                    sender=sender, minpause=minpause))
         
-        # Use default context if argument is omitted
+        # Use shared default context if argument is omitted
         if (ssl_context is None):
-            ssl_context = ssl.create_default_context()
+            ssl_context = _default_ssl_context()
         
-        # Set timestamp of last mail to 0 (first mail shall be sent out any way)
-        self._last_mail_utc_ts = 0
+        self._init_minpause()
 
-        super().__init__(self._credentials["host"], self._credentials["port"], context=ssl_context)
+        super().__init__(self._host, self._port, context=ssl_context)
 
     def login(self, user: str|None = None, password: str|None = None, 
               initial_response_ok: bool = True) -> tuple[int, bytes]:
@@ -136,22 +384,61 @@ class EasySSLSendmail(smtplib.SMTP_SSL):
         Returns:
             tuple: see smtplib.SMTP_SSL.login()
         """
-        # use values from _credentials (or "") if not provided as arguments
-        if user is None:
-            if "user" in self._credentials:
-                user = self._credentials["user"]
-            else:
-                logger.warning("username neither passed as argument "
-                               "nor found in credentials dict -> using empty string")
-                user = ""
-        if password is None:
-            if "password" in self._credentials:
-                password = self._credentials["password"]
-            else:
-                logger.warning("password neither passed as argument "
-                               "nor found in credentials dict -> using empty string")
-                password = ""
-        return super().login(user, password, initial_response_ok=initial_response_ok)
+        user, password = self._resolve_login(user, password)
+        result = super().login(user, password, initial_response_ok=initial_response_ok)
+        self._login_args = (user, password)
+        return result
+
+    def ensure_connection(self) -> None:
+        """Make sure the connection to the mail server is usable. If the
+        connection has been closed, it is reopened. Otherwise a NOOP command
+        checks if the server is still responding; if not, a new connection
+        is established. If login() has been called before, the login is
+        repeated with the same arguments after reconnecting.
+
+        If reconnecting fails, the new connection is closed again, so that
+        the next call starts over.
+
+        Raises:
+            SMTPConnectError: if the server does not greet with 220
+            exc: any exception raised by smtplib.SMTP_SSL.connect() or login()
+        """
+        if self.sock is not None:
+            try:
+                code, _ = self.noop()
+                if code == 250:
+                    return
+            except (smtplib.SMTPServerDisconnected, OSError):
+                pass
+            self.close()
+        try:
+            code, msg = self.connect(self._host, self._port)
+            if code != 220:
+                raise smtplib.SMTPConnectError(code, msg)
+            if self._login_args is not None:
+                super().login(*self._login_args)
+        except Exception:
+            # never keep a connection which is not (fully) set up
+            self._drop_connection()
+            raise
+
+    def close(self) -> None:
+        """Close the connection and forget the EHLO/HELO state of the session,
+        so that it is negotiated again after a reconnect (smtplib.SMTP.close()
+        only resets it via quit()).
+        """
+        super().close()
+        self.ehlo_resp = self.helo_resp = None
+        self.esmtp_features = {}
+        self.does_esmtp = False
+
+    def _drop_connection(self) -> None:
+        """Close the connection after a fatal error. QUIT is sent, if possible.
+        """
+        try:
+            self.quit()
+        except (smtplib.SMTPServerDisconnected, OSError):
+            self.close()
     
     def send_mail_message(self, mail_subject: str, mail_to: str, 
                     mail_text: str, *, mail_html: str|None = None,
@@ -164,65 +451,536 @@ class EasySSLSendmail(smtplib.SMTP_SSL):
         If minpause hat a valid value, the message is sent only, if the minimum
         timespan between this message and the preceeding message is longer
         than minpause seconds. If not, a warning message will be logged.
+        Technically, one token per minpause seconds is added to a bucket holding
+        up to MINPAUSE_BURST tokens and each mail takes one token. The check
+        uses time.monotonic() and is therefore not affected by clock changes.
+
+        The connection is kept open for further messages. If an exception
+        other than one of the RECOVERABLE_EXCEPTIONS occurs, the connection
+        is closed. It will be reopened by the next call.
 
         Args:
             mail_subject (str): Message subject
             mail_to (str): Receiver of the eMail
             mail_text (str): Plain text eMail body
             mail_html (str, optional): HTML eMail body. Defaults to None.
-            sender (str, optional): sender address. Defaults to None (use self._credentials["sender"]).
+            sender (str, optional): sender address. Defaults to None (use sender passed to constructor).
             minpause (int, optional): minimum timespan between two sentout mails.
-                                      Defaults to None (use self._credentials["minpause"]).
+                                      Defaults to None (use minpause passed to constructor).
 
         Raises:
-            exc: any exception raised by smtplib.SMTP_SSL.send_message()
+            exc: any exception raised by smtplib.SMTP_SSL.sendmail()
 
         Returns:
-            dict: see smtplib.SMTP_SSL.send_message()
+            dict: see smtplib.SMTP_SSL.sendmail()
         """
-        # Get value for minpause
-        if minpause is None:
-            if "minpause" in self._credentials:
-                minpause = self._credentials["minpause"]
-        # Get value for sender
-        if sender is None:
-            if "sender" in self._credentials:
-                sender = self._credentials["sender"]
-            else:
-                logger.warning("sender address neither passed as argument "
-                               "nor found in credentials dict!")
-                sender = "(unknown sender)"
+        if not self._minpause_reserve(minpause):
+            return {}
+        sender = self._resolve_sender(sender)
+
+        try:
+            # reopen connection, if it has been closed after an error
+            if self.sock is None:
+                self.ensure_connection()
+            # only Subject, From and To are set, so the header scan
+            # of send_message() is not needed
+            from_addr, to_addrs, raw, mail_options = self._render_message(
+                                mail_subject, mail_to, mail_text, mail_html, sender)
+            return super().sendmail(from_addr, to_addrs, raw, mail_options)
+        except Exception as exc:
+            self._minpause_release(minpause)
+            # keep the session for the next message only if it is in a defined state
+            if not isinstance(exc, self.RECOVERABLE_EXCEPTIONS):
+                self._drop_connection()
+            # in case of an exception, log error and reraise exception
+            logger.error("%s: %s", type(exc).__name__, exc, exc_info=exc)
+            raise
 
-        # if found, check if mail shall be sent
-        if isinstance(minpause, int):
-            timediff = int(datetime.timestamp(datetime.now(timezone.utc))) - self._last_mail_utc_ts
-            if timediff < minpause:
-                # if mail is suppressed, log warning
-                logger.warning(f"minpause of {minpause} s prevents mail from being sent. "
-                               f"time since last mail: {timediff} s")
+    def send_many(self, messages: Iterable[dict]) -> list[dict]:
+        """Send several messages over the same connection. The connection is
+        checked once (see ensure_connection()) before the first message.
+        Messages are sent grouped by the domain of mail_to.
+
+        Args:
+            messages (Iterable[dict]): keyword arguments for send_mail_message(),
+                                       one dict per message
+
+        Returns:
+            list: results of send_mail_message(), one per message in input order
+        """
+        self.ensure_connection()
+        grouped = self._group_by_domain(messages)
+        results: list[dict] = [{}] * len(grouped)
+        for pos, message in grouped:
+            results[pos] = self.send_mail_message(**message)
+        return results
+
+    def _check_mail_options(self, mail_options: list[str]) -> None:
+        """ Raise SMTPNotSupportedError if mail_options (see _envelope_policy())
+        need SMTPUTF8, but the server does not advertise it.
+        """
+        if "SMTPUTF8" in mail_options and not self.has_extn("smtputf8"):
+            raise smtplib.SMTPNotSupportedError(
+                "One or more source or delivery addresses require"
+                " internationalized email support, but the server"
+                " does not advertise the required SMTPUTF8 capability")
+
+    def send_pipelined(self, messages: Iterable[EmailMessage]) -> list[dict]:
+        """Send several prepared messages using the SMTP PIPELINING extension
+        (RFC 2920). For each message MAIL FROM, all RCPT TO and DATA commands
+        are sent in one go before the replies are read. Sender and recipients
+        are taken from the From, To, Cc and Bcc headers; Bcc and Resent-Bcc are
+        not transmitted. Messages with non-ASCII envelope addresses are sent
+        with SMTPUTF8 (see send_mail_message()).
+        If the server does not support pipelining, send_message() is used.
+
+        All commands of a message are encoded before the first one is written.
+        If sending is interrupted by an error other than an SMTP error reply,
+        the connection is closed, since unread replies may be pending.
+
+        Args:
+            messages (Iterable[EmailMessage]): messages to be sent
+
+        Raises:
+            SMTPSenderRefused, SMTPRecipientsRefused, SMTPDataError:
+                see smtplib.SMTP.sendmail()
+            SMTPNotSupportedError: if SMTPUTF8 is needed, but not supported by the server
+
+        Returns:
+            list: refused recipients, one dict per message (see smtplib.SMTP.sendmail())
+        """
+        self.ehlo_or_helo_if_needed()
+        if not self.has_extn("pipelining"):
+            return [self.send_message(msg) for msg in messages]
+        results = []
+        for msg in messages:
+            from_addr = getaddresses([msg["From"] or ""])[0][1]
+            to_addrs = [addr for _, addr in getaddresses(
+                            msg.get_all("To", []) + msg.get_all("Cc", []) + msg.get_all("Bcc", []))]
+            policy, mail_options = _envelope_policy([from_addr, *to_addrs])
+            self._check_mail_options(mail_options)
+            msg_copy = copy.copy(msg)
+            del msg_copy["Bcc"]
+            del msg_copy["Resent-Bcc"]
+            # quote leading periods and terminate with <CRLF>.<CRLF>
+            data = re.sub(rb"(?m)^\.", b"..", msg_copy.as_bytes(policy=policy))
+            if not data.endswith(b"\r\n"):
+                data += b"\r\n"
+            data += b".\r\n"
+            # encode the whole command group before anything is written
+            commands = [" ".join([f"MAIL FROM:{smtplib.quoteaddr(from_addr)}", *mail_options])]
+            commands += [f"RCPT TO:{smtplib.quoteaddr(addr)}" for addr in to_addrs]
+            commands.append("DATA")
+            if any("\r" in cmd or "\n" in cmd for cmd in commands):
+                raise ValueError("command and arguments contain prohibited newline characters")
+            command_bytes = "".join(f"{cmd}\r\n" for cmd in commands).encode(
+                                        "utf-8" if mail_options else "ascii")
+            try:
+                # send command group, then read replies in order
+                self.send(command_bytes)
+                mail_reply = self.getreply()
+                senderrs = {}
+                for addr in to_addrs:
+                    code, resp = self.getreply()
+                    if code not in (250, 251):
+                        senderrs[addr] = (code, resp)
+                data_code, data_resp = self.getreply()
+                if data_code == 354:
+                    if mail_reply[0] != 250 or len(senderrs) == len(to_addrs):
+                        # DATA accepted anyway: abort with an empty message
+                        self.send(b".\r\n")
+                        self.getreply()
+                    else:
+                        self.send(data)
+                        data_code, data_resp = self.getreply()
+            except Exception:
+                # replies may be pending: session cannot be used any more
+                self._drop_connection()
+                raise
+            if mail_reply[0] != 250:
+                self._rset()
+                raise smtplib.SMTPSenderRefused(mail_reply[0], mail_reply[1], from_addr)
+            if len(senderrs) == len(to_addrs):
+                self._rset()
+                raise smtplib.SMTPRecipientsRefused(senderrs)
+            if data_code != 250:
+                self._rset()
+                raise smtplib.SMTPDataError(data_code, data_resp)
+            results.append(senderrs)
+        return results
+
+    def send_broadcast(self, msg: EmailMessage, recipients: Iterable[str],
+                       sender: str|None = None) -> dict:
+        """Send the same message to several recipients, one SMTP transaction
+        per recipient. The message is converted to bytes only once. Its
+        headers (including To) are sent unchanged, except Bcc and Resent-Bcc,
+        which are removed (like smtplib.SMTP.send_message() does).
+        Note that minpause is not applied.
+
+        Args:
+            msg (EmailMessage): message to be sent
+            recipients (Iterable[str]): envelope recipients
+            sender (str, optional): envelope sender. Defaults to None (use sender from credentials dict).
+
+        Raises:
+            SMTPNotSupportedError: if SMTPUTF8 is needed, but not supported by the server
+
+        Returns:
+            dict: refused recipients (see smtplib.SMTP.sendmail())
+        """
+        from_addr = getaddresses([self._resolve_sender(sender)])[0][1]
+        msg_copy = copy.copy(msg)
+        del msg_copy["Bcc"]
+        del msg_copy["Resent-Bcc"]
+        # at most two renderings: plain and utf8 policy
+        raw_by_policy: dict[EmailPolicy, bytes] = {}
+        self.ehlo_or_helo_if_needed()
+        refused = {}
+        for rcpt in recipients:
+            policy, mail_options = _envelope_policy([from_addr, rcpt])
+            self._check_mail_options(mail_options)
+            raw = raw_by_policy.get(policy)
+            if raw is None:
+                buf = BytesIO()
+                BytesGenerator(buf, policy=policy).flatten(msg_copy)
+                raw = raw_by_policy[policy] = buf.getvalue()
+            try:
+                refused.update(self.sendmail(from_addr, [rcpt], raw, mail_options))
+            except smtplib.SMTPRecipientsRefused as exc:
+                refused.update(exc.recipients)
+        return refused
+
+    def prepare_template(self, subject: str, sender: str, text: str,
+                         html: str|None = None) -> PreparedMessage:
+        """Create a message which can be sent to many recipients, see
+        PreparedMessage. Subject, sender and body are encoded only once.
+
+        Args:
+            subject (str): Message subject
+            sender (str): sender address
+            text (str): Plain text eMail body
+            html (str, optional): HTML eMail body. Defaults to None.
+
+        Returns:
+            PreparedMessage: the message template
+        """
+        msg = EmailMessage()
+        msg["Subject"] = subject
+        msg["From"] = sender
+        msg.set_content(text)
+        if isinstance(html, str):
+            msg.add_alternative(html, subtype="html")
+        return PreparedMessage(server=self, msg=msg,
+                               sender=getaddresses([sender])[0][1],
+                               raw=msg.as_bytes(policy=_smtp_policy()))
+
+
+class PreparedMessage:
+    """Message without To header, rendered to bytes once. send() puts the
+    encoded To header in front of the rendered message for each recipient.
+    Create instances with EasySSLSendmail.prepare_template(). Note that
+    minpause is not applied.
+    """
+
+    def __init__(self, server: EasySSLSendmail, msg: EmailMessage,
+                 sender: str, raw: bytes):
+        self.server = server
+        """ connection used for sending """
+        self.msg = msg
+        """ the message (without To header) """
+        self.sender = sender
+        """ envelope sender address """
+        self.raw = raw
+        """ msg rendered with policy email.policy.SMTP """
+
+    def send(self, rcpt: str) -> dict:
+        """Send the message to a recipient.
+
+        If an address contains non-ASCII characters, the To header is
+        encoded as UTF-8 and the message is sent with SMTPUTF8.
+
+        Args:
+            rcpt (str): Receiver of the eMail, used as To header
+
+        Raises:
+            SMTPNotSupportedError: if SMTPUTF8 is needed, but not supported by the server
+
+        Returns:
+            dict: see smtplib.SMTP.sendmail()
+        """
+        to_addrs = [addr for _, addr in getaddresses([rcpt])]
+        policy, mail_options = _envelope_policy([self.sender, *to_addrs])
+        self.server.ehlo_or_helo_if_needed()
+        self.server._check_mail_options(mail_options)
+        to_header = policy.fold_binary("To", policy.header_factory("To", rcpt))
+        return self.server.sendmail(self.sender, to_addrs, to_header + self.raw,
+                                    mail_options)
+
+
+class EasySSLSendmailPool(_SendmailCommon):
+    """Pool of EasySSLSendmail connections, logged in if a user is configured.
+    send_mail_message() may be called from several threads; each call uses a
+    free connection of the pool. After max_per_conn mails a connection is
+    closed and replaced by a new one. The minpause check is done by the pool,
+    i.e. all connections share one token bucket. After close(), connections
+    still in use are closed when they are returned, and further calls of
+    send_mail_message() raise smtplib.SMTPServerDisconnected.
+
+    Usage:
+        with EasySSLSendmail.pool(size=5, json_mail_info=path) as pool:
+            pool.send_mail_message(...)
+    """
+
+    def __init__(self, credentials: dict, *,
+                 sendmail_class: type[EasySSLSendmail] = EasySSLSendmail,
+                 size: int = 5, max_per_conn: int = 100,
+                 ssl_context: ssl.SSLContext|None = None):
+        """ Create size connections and log in.
+
+        Args:
+            credentials (dict): see EasySSLSendmail.make_credentials_dict()
+            sendmail_class (type, optional): class of the connections.
+                                             Defaults to EasySSLSendmail.
+            size (int, optional): number of connections. Defaults to 5.
+            max_per_conn (int, optional): number of mails after which a connection
+                                          is replaced by a new one. Defaults to 100.
+            ssl_context (ssl.SSLContext, optional): see EasySSLSendmail.__init__()
+        """
+        self._set_credentials(credentials)
+        self._init_minpause()
+        # connections do not check minpause themselves, see send_mail_message()
+        self._credentials = {key: value for key, value in credentials.items()
+                             if key != "minpause"}
+        self._sendmail_class = sendmail_class
+        self._max_per_conn = max_per_conn
+        self._ssl_context = ssl_context
+        # free connections as [server, number of mails sent];
+        # None is put into the queue by close() to wake up waiting threads
+        import queue
+        self._queue: queue.Queue[list|None] = queue.Queue()
+        # guards _closed against connections being returned concurrently
+        # and the minpause token bucket
+        self._lock = threading.Lock()
+        self._closed = False
+        try:
+            for _ in range(size):
+                self._queue.put([self._connect(), 0])
+        except BaseException:
+            self.close()
+            raise
+
+    def _connect(self) -> EasySSLSendmail:
+        """ Open a new connection and log in, if a user is configured.
+        """
+        server = self._sendmail_class(json_mail_info=self._credentials,
+                                      ssl_context=self._ssl_context)
+        if self._user is None:
+            return server
+        try:
+            server.login()
+        except BaseException:
+            server.close()
+            raise
+        return server
+
+    def send_mail_message(self, *args, minpause: int|None = None, **kwargs) -> dict:
+        """ Send a message using a free connection of the pool. Waits until
+        a connection is available. minpause applies to all mails sent by
+        the pool.
+
+        Args:
+            see EasySSLSendmail.send_mail_message()
+
+        Raises:
+            smtplib.SMTPServerDisconnected: if the pool has been closed
+
+        Returns:
+            dict: see EasySSLSendmail.send_mail_message()
+        """
+        with self._lock:
+            if not self._minpause_reserve(minpause):
                 return {}
-        
         try:
-            if not isinstance(mail_html, str):   
-                # send text message
-                tmsg = EmailMessage()
-                tmsg["Subject"] = mail_subject
-                tmsg["From"] = sender
-                tmsg["To"] = mail_to
-                tmsg.set_content(mail_text)
-                return super().send_message(tmsg)
-            else:   
-                # send multipart message with HTML part
-                # and an alternative text part
-                hmsg: MIMEMultipart = MIMEMultipart("alternative")  # default is "mixed"
-                hmsg["Subject"] = mail_subject
-                hmsg["From"] = sender
-                hmsg["To"] = mail_to
-                hmsg.attach(MIMEText(mail_text, "plain"))
-                hmsg.attach(MIMEText(mail_html, "html"))
-                return super().send_message(hmsg)
+            return self._send_pooled(*args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self._minpause_release(minpause)
+            raise
+
+    def _send_pooled(self, *args, **kwargs) -> dict:
+        """ Send a message using a free connection, see send_mail_message().
+        """
+        entry = self._queue.get()
+        if entry is None:
+            # pass wake-up marker on to other waiting threads
+            self._queue.put(None)
+            raise smtplib.SMTPServerDisconnected("connection pool has been closed")
+        try:
+            if entry[1] >= self._max_per_conn:
+                # rotate connection
+                entry[0]._drop_connection()
+                entry[:] = [self._connect(), 0]
+            result = entry[0].send_mail_message(*args, **kwargs)
+            entry[1] += 1
+            return result
+        finally:
+            with self._lock:
+                if not self._closed:
+                    self._queue.put(entry)
+                    entry = None
+            if entry is not None:
+                # pool has been closed meanwhile
+                entry[0]._drop_connection()
+
+    def close(self) -> None:
+        """ Quit all free connections of the pool. Connections in use are
+        closed when they are returned.
+        """
+        import queue
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not None:
+                entry[0]._drop_connection()
+        self._queue.put(None)
+
+    def __enter__(self) -> EasySSLSendmailPool:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class AsyncEasySSLSendmail(_SendmailCommon):
+    """asyncio variant of EasySSLSendmail based on aiosmtplib (install with
+    the extra "async"). One instance holds one connection; for concurrent
+    sending, use several instances, e.g. with asyncio.gather().
+
+    Usage:
+        async with AsyncEasySSLSendmail(json_mail_info=path) as server:
+            await server.login()
+            await server.send_mail_message(...)
+    """
+
+    __slots__ = ("smtp",)
+
+    def __init__(self, *, json_mail_info: dict|FileDescriptorOrPath|None = None,
+                 host: str|None = None, port: int|None = None, 
+                 user: str|None = None, password: str|None = None,
+                 sender: str|None = None, minpause: int|None = None,
+                 ssl_context: ssl.SSLContext|None = None):
+        """ Create new instance. The connection is opened by connect() or
+        when entering the async context.
+
+        Args:
+            see EasySSLSendmail.__init__()
+
+        Raises:
+            ImportError: if aiosmtplib is not installed
+        """
+        try:
+            import aiosmtplib
+        except ImportError as exc:
+            raise ImportError("AsyncEasySSLSendmail requires aiosmtplib "
+                              "(pip install mailtools_vrb[async])") from exc
+        self._set_credentials(EasySSLSendmail.make_credentials_dict(
+                                    json_mail_info=json_mail_info,
+                                    host=host, port=port, 
+                                    user=user, password=password,
+                                    sender=sender, minpause=minpause))
+        if (ssl_context is None):
+            ssl_context = _default_ssl_context()
+        self._init_minpause()
+        self.smtp: aiosmtplib.SMTP = aiosmtplib.SMTP(hostname=self._host,
+                                                     port=self._port,
+                                                     use_tls=True, tls_context=ssl_context)
+        """ the underlying aiosmtplib connection """
+
+    async def connect(self) -> None:
+        """ Connect to the mail server. If login() has been called before,
+        the login is repeated with the same arguments.
+        """
+        await self.smtp.connect()
+        if self._login_args is not None:
+            await self.smtp.login(*self._login_args)
+
+    async def login(self, user: str|None = None, password: str|None = None) -> None:
+        """ Login to the mail server, see EasySSLSendmail.login().
+        """
+        user, password = self._resolve_login(user, password)
+        await self.smtp.login(user, password)
+        self._login_args = (user, password)
+
+    async def quit(self) -> None:
+        """ Send QUIT and close the connection.
+        """
+        await self.smtp.quit()
+
+    async def send_mail_message(self, mail_subject: str, mail_to: str, 
+                    mail_text: str, *, mail_html: str|None = None,
+                    sender: str|None = None, minpause: int|None = None) -> dict:
+        """Send a text or multipart eMail message, see
+        EasySSLSendmail.send_mail_message(). If the connection has been
+        closed, it is reopened.
+
+        Raises:
+            exc: any exception raised by aiosmtplib.SMTP.sendmail()
+
+        Returns:
+            dict: refused recipients, see aiosmtplib.SMTP.sendmail()
+        """
+        # the token is taken before the first await, so that concurrent
+        # calls on this instance see it
+        if not self._minpause_reserve(minpause):
+            return {}
+        sender = self._resolve_sender(sender)
+
+        try:
+            if not self.smtp.is_connected:
+                await self.connect()
+            from_addr, to_addrs, raw, mail_options = self._render_message(
+                                mail_subject, mail_to, mail_text, mail_html, sender)
+            refused, _ = await self.smtp.sendmail(from_addr, to_addrs, raw,
+                                                  mail_options=mail_options)
+            return refused
         except BaseException as exc:
-            self.quit()
-            # in case of an exception, log error and reraise exception
-            logger.error(f"{type(exc).__name__}: {exc}", exc_info=exc)
+            # no mail sent (also if cancelled): give back the token
+            self._minpause_release(minpause)
+            if isinstance(exc, Exception):
+                # in case of an exception, log error and reraise exception
+                logger.error("%s: %s", type(exc).__name__, exc, exc_info=exc)
             raise
+
+    async def send_many(self, messages: Iterable[dict]) -> list[dict]:
+        """Send several messages over the same connection.
+        Messages are sent grouped by the domain of mail_to.
+
+        Args:
+            messages (Iterable[dict]): keyword arguments for send_mail_message(),
+                                       one dict per message
+
+        Returns:
+            list: results of send_mail_message(), one per message in input order
+        """
+        grouped = self._group_by_domain(messages)
+        results: list[dict] = [{}] * len(grouped)
+        for pos, message in grouped:
+            results[pos] = await self.send_mail_message(**message)
+        return results
+
+    async def __aenter__(self) -> AsyncEasySSLSendmail:
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        if self.smtp.is_connected:
+            try:
+                await self.smtp.quit()
+            except Exception:
+                self.smtp.close()
@@ -0,0 +1,152 @@
+""" Local fake SMTP server for the offline tests (test_*.py).
+
+Run the tests with "python -m unittest discover -s tests" (or pytest).
+No network access or mail account is needed.
+"""
+
+from __future__ import annotations
+
+import logging, socket, threading
+from email.message import EmailMessage
+
+from mailtools_vrb import EasySSLSendmail
+
+# errors and minpause warnings are expected in the tests
+logging.getLogger("mailtools_vrb").setLevel(logging.CRITICAL)
+
+class FakeSMTPServer:
+    """ Minimal SMTP server on localhost, one thread per client.
+    Every received line (commands and message data) is appended to log.
+    Recipients containing "bad" are refused with 550.
+    """
+
+    def __init__(self, *, pipelining: bool = True, data_always_354: bool = False,
+                 drop_after_data: int = 0, smtputf8: bool = True, auth: bool = True,
+                 fail_auth_on: tuple[int, ...] = (), greeting_on: dict[int, bytes]|None = None):
+        self.pipelining = pipelining
+        self.data_always_354 = data_always_354
+        self.drop_after_data = drop_after_data  # close connection after n-th DATA
+        self.smtputf8 = smtputf8
+        self.auth = auth  # advertise AUTH PLAIN
+        self.fail_auth_on = fail_auth_on  # connection numbers (from 1) with AUTH failing
+        self.greeting_on = greeting_on or {}  # connection number -> greeting line
+        self.log: list[str] = []
+        self.connections = 0
+        self._data_count = 0
+        self._srv = socket.socket()
+        self._srv.bind(("127.0.0.1", 0))
+        self._srv.listen(5)
+        self.port = self._srv.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def commands(self) -> list[str]:
+        """ logged lines, which are SMTP commands """
+        return [line for line in self.log if line.split(" ")[0].upper() in
+                ("EHLO", "HELO", "AUTH", "MAIL", "RCPT", "DATA", "RSET", "NOOP", "QUIT")]
+
+    def subjects(self) -> list[str]:
+        """ Subject headers of the received messages """
+        return [line for line in self.log if line.startswith("Subject:")]
+
+    def _serve(self) -> None:
+        while True:
+            conn, _ = self._srv.accept()
+            self.connections += 1
+            threading.Thread(target=self._handle, args=(conn, self.connections),
+                             daemon=True).start()
+
+    def _handle(self, conn: socket.socket, number: int) -> None:
+        try:
+            self._session(conn, number)
+        except OSError:
+            pass
+        conn.close()
+
+    def _session(self, conn: socket.socket, number: int) -> None:
+        fp = conn.makefile("rb")
+        greeting = self.greeting_on.get(number, b"220 fake ESMTP")
+        conn.sendall(greeting + b"\r\n")
+        if not greeting.startswith(b"220"):
+            return
+        ehlo = False
+        rcpts = 0
+        while True:
+            line = fp.readline()
+            if not line:
+                return
+            text = line.decode("utf-8", "replace").rstrip("\r\n")
+            self.log.append(text)
+            verb = text.split(" ")[0].upper()
+            if verb == "EHLO":
+                ehlo = True
+                features = ["250-fake"]
+                if self.auth:
+                    features.append("250-AUTH PLAIN")
+                if self.pipelining:
+                    features.append("250-PIPELINING")
+                if self.smtputf8:
+                    features.append("250-SMTPUTF8")
+                features.append("250 8BITMIME")
+                conn.sendall("\r\n".join(features).encode() + b"\r\n")
+            elif verb == "QUIT":
+                conn.sendall(b"221 bye\r\n")
+                return
+            elif verb == "NOOP":
+                conn.sendall(b"250 ok\r\n")
+            elif not ehlo:
+                conn.sendall(b"503 EHLO first\r\n")
+            elif verb == "AUTH":
+                if not self.auth:
+                    conn.sendall(b"502 not implemented\r\n")
+                elif number in self.fail_auth_on:
+                    conn.sendall(b"535 authentication failed\r\n")
+                else:
+                    conn.sendall(b"235 ok\r\n")
+            elif verb == "MAIL":
+                rcpts = 0
+                conn.sendall(b"250 ok\r\n")
+            elif verb == "RCPT":
+                if "bad" in text:
+                    conn.sendall(b"550 no such user\r\n")
+                else:
+                    rcpts += 1
+                    conn.sendall(b"250 ok\r\n")
+            elif verb == "DATA":
+                if rcpts == 0 and not self.data_always_354:
+                    conn.sendall(b"554 no valid recipients\r\n")
+                    continue
+                conn.sendall(b"354 go ahead\r\n")
+                while True:
+                    data = fp.readline()
+                    if not data:
+                        return
+                    self.log.append(data.decode("utf-8", "replace").rstrip("\r\n"))
+                    if data == b".\r\n":
+                        break
+                self._data_count += 1
+                if self._data_count == self.drop_after_data:
+                    return
+                conn.sendall(b"554 empty\r\n" if rcpts == 0 else b"250 queued\r\n")
+            else:
+                conn.sendall(b"250 ok\r\n")
+
+class PlainSendmail(EasySSLSendmail):
+    """ EasySSLSendmail using a plain TCP socket instead of SSL """
+
+    def _get_socket(self, host, port, timeout):
+        return socket.create_connection((host, port), timeout)
+
+def connect(server: FakeSMTPServer, **kwargs) -> PlainSendmail:
+    """ connect and login to the fake server """
+    sendmail = PlainSendmail(host="127.0.0.1", port=server.port,
+                             user="me@x.org", password="secret", **kwargs)
+    sendmail.login()
+    return sendmail
+
+def make_message(to: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = "Test"
+    msg["From"] = "Me <me@x.org>"
+    msg["To"] = to
+    msg.set_content(".leading dot\nsecond line\n")
+    return msg
@@ -0,0 +1,54 @@
+""" Offline tests for AsyncEasySSLSendmail (need aiosmtplib) """
+
+import asyncio, importlib.util, unittest
+
+from fake_smtp import FakeSMTPServer
+
+HAVE_AIOSMTPLIB = importlib.util.find_spec("aiosmtplib") is not None
+
+@unittest.skipUnless(HAVE_AIOSMTPLIB, "aiosmtplib not installed")
+class TestAsyncSendmail(unittest.TestCase):
+
+    def make_sendmail(self, server: FakeSMTPServer, **kwargs):
+        from mailtools_vrb import AsyncEasySSLSendmail
+        sendmail = AsyncEasySSLSendmail(host="127.0.0.1", port=server.port,
+                                        user="me@x.org", password="secret", **kwargs)
+        sendmail.smtp.use_tls = False
+        return sendmail
+
+    def test_minpause(self):
+        import aiosmtplib
+        server = FakeSMTPServer()
+        sendmail = self.make_sendmail(server, minpause=60)
+
+        async def send_all() -> list:
+            async with sendmail:
+                # a failed mail gives its token back
+                with self.assertRaises(aiosmtplib.SMTPRecipientsRefused):
+                    await sendmail.send_mail_message("refused", "bad@y.org", "text")
+                # concurrent calls share the token bucket
+                return await asyncio.gather(*[
+                    sendmail.send_mail_message(f"mail {i}", "a@y.org", "text")
+                    for i in range(5)])
+
+        self.assertEqual(asyncio.run(send_all()), [{}] * 5)
+        self.assertEqual(server.subjects(), ["Subject: mail 0"])
+
+    def test_reenter_logs_in(self):
+        server = FakeSMTPServer()
+        sendmail = self.make_sendmail(server)
+
+        async def send_twice() -> None:
+            async with sendmail:
+                await sendmail.login()
+                await sendmail.send_mail_message("first", "a@y.org", "text")
+            async with sendmail:
+                await sendmail.send_mail_message("second", "a@y.org", "text")
+
+        asyncio.run(send_twice())
+        self.assertEqual(server.connections, 2)
+        self.assertEqual([cmd.split(" ")[0] for cmd in server.commands()].count("AUTH"), 2)
+        self.assertEqual(server.subjects(), ["Subject: first", "Subject: second"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+""" Offline tests for EasySSLSendmail.send_broadcast() """
+
+import smtplib, unittest
+
+from fake_smtp import FakeSMTPServer, connect, make_message
+
+class TestSendBroadcast(unittest.TestCase):
+
+    def test_broadcast(self):
+        server = FakeSMTPServer()
+        msg = make_message("list@x.org")
+        msg["Bcc"] = "hidden@y.org"
+        with connect(server, sender="Me <me@x.org>") as sendmail:
+            refused = sendmail.send_broadcast(msg, ["a@y.org", "bad@y.org", "c@y.org"])
+        self.assertEqual(refused, {"bad@y.org": (550, b"no such user")})
+        self.assertEqual([line for line in server.log if line.startswith("rcpt")],
+                         ["rcpt TO:<a@y.org>", "rcpt TO:<bad@y.org>", "rcpt TO:<c@y.org>"])
+        self.assertFalse(any(line.startswith("Bcc") for line in server.log))
+        # the original message is left untouched
+        self.assertEqual(msg["Bcc"], "hidden@y.org")
+
+    def test_default_sender(self):
+        server = FakeSMTPServer()
+        msg = make_message("list@x.org")
+        with connect(server, sender="List <list@x.org>") as sendmail:
+            self.assertEqual(sendmail.send_broadcast(msg, ["a@y.org"]), {})
+            self.assertEqual(sendmail.send_broadcast(msg, ["a@y.org"], sender="me@x.org"), {})
+        self.assertEqual([line for line in server.log if line.startswith("mail")],
+                         ["mail FROM:<list@x.org>", "mail FROM:<me@x.org>"])
+
+    def test_international_address(self):
+        server = FakeSMTPServer()
+        msg = make_message("Liste <list@x.org>")
+        with connect(server, sender="me@x.org") as sendmail:
+            self.assertEqual(sendmail.send_broadcast(msg, ["a@y.org", "jörg@y.org"]), {})
+        self.assertEqual([line for line in server.log if line.startswith("mail")],
+                         ["mail FROM:<me@x.org>", "mail FROM:<me@x.org> SMTPUTF8 BODY=8BITMIME"])
+        self.assertIn("rcpt TO:<jörg@y.org>", server.log)
+
+    def test_international_address_not_supported(self):
+        server = FakeSMTPServer(smtputf8=False)
+        with connect(server, sender="me@x.org") as sendmail:
+            with self.assertRaises(smtplib.SMTPNotSupportedError):
+                sendmail.send_broadcast(make_message("list@x.org"), ["jörg@y.org"])
+            self.assertEqual(sendmail.send_broadcast(make_message("list@x.org"), ["a@y.org"]), {})
+        self.assertFalse(any(line.startswith("rcpt TO:<j") for line in server.log))
+
+if __name__ == "__main__":
+    unittest.main()
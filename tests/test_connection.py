@@ -0,0 +1,66 @@
+""" Offline tests for connection handling in EasySSLSendmail """
+
+import smtplib, unittest
+
+from fake_smtp import FakeSMTPServer, connect
+
+class TestConnection(unittest.TestCase):
+
+    def test_reconnect(self):
+        server = FakeSMTPServer(drop_after_data=1)
+        with connect(server) as sendmail:
+            with self.assertRaises(smtplib.SMTPServerDisconnected):
+                sendmail.send_mail_message("first", "a@y.org", "text")
+            self.assertEqual(sendmail.send_mail_message("second", "a@y.org", "text"), {})
+        self.assertEqual(server.connections, 2)
+        commands = server.commands()
+        second = commands[commands.index("data") + 1:]
+        # EHLO is sent again after reconnecting
+        self.assertEqual([cmd.split(" ")[0].lower() for cmd in second[:3]],
+                         ["ehlo", "auth", "mail"])
+
+    def test_error_closes_connection(self):
+        server = FakeSMTPServer()
+        with connect(server) as sendmail:
+            # OSError in the middle of a transaction (after MAIL and first RCPT)
+            rcpt = sendmail.rcpt
+            def failing_rcpt(addr, options=()):
+                if "fail" in addr:
+                    raise OSError("simulated network error")
+                return rcpt(addr, options)
+            sendmail.rcpt = failing_rcpt
+            with self.assertRaises(OSError):
+                sendmail.send_mail_message("first", "a@y.org, fail@y.org", "text")
+            # the interrupted transaction is not continued on the old connection
+            self.assertIsNone(sendmail.sock)
+            self.assertEqual(sendmail.send_mail_message("second", "a@y.org", "text"), {})
+        self.assertEqual(server.connections, 2)
+
+    def test_relogin_fails(self):
+        server = FakeSMTPServer(drop_after_data=1, fail_auth_on=(2,))
+        with connect(server) as sendmail:
+            with self.assertRaises(smtplib.SMTPServerDisconnected):
+                sendmail.send_mail_message("first", "a@y.org", "text")
+            with self.assertRaises(smtplib.SMTPAuthenticationError):
+                sendmail.send_mail_message("second", "a@y.org", "text")
+            # unauthenticated connection is not kept
+            self.assertIsNone(sendmail.sock)
+            self.assertEqual(sendmail.send_mail_message("third", "a@y.org", "text"), {})
+        self.assertEqual(server.connections, 3)
+        self.assertEqual([cmd.split(" ")[0].upper() for cmd in server.commands()].count("AUTH"), 3)
+        self.assertEqual(server.subjects(), ["Subject: first", "Subject: third"])
+
+    def test_reconnect_rejected(self):
+        server = FakeSMTPServer(drop_after_data=1, greeting_on={2: b"421 busy"})
+        with connect(server) as sendmail:
+            with self.assertRaises(smtplib.SMTPServerDisconnected):
+                sendmail.send_mail_message("first", "a@y.org", "text")
+            with self.assertRaises(smtplib.SMTPConnectError) as cm:
+                sendmail.send_mail_message("second", "a@y.org", "text")
+            self.assertEqual(cm.exception.smtp_code, 421)
+            self.assertIsNone(sendmail.sock)
+            self.assertEqual(sendmail.send_mail_message("third", "a@y.org", "text"), {})
+        self.assertEqual(server.connections, 3)
+
+if __name__ == "__main__":
+    unittest.main()
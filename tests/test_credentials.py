@@ -0,0 +1,30 @@
+""" Offline tests for EasySSLSendmail.make_credentials_dict() """
+
+import json, os, tempfile, unittest
+
+from mailtools_vrb import EasySSLSendmail
+
+class TestCredentialsFile(unittest.TestCase):
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "credentials.json")
+            with open(path, "w") as fp:
+                json.dump({"host": "one", "user": "me@x.org"}, fp)
+            st = os.stat(path)
+            credentials = EasySSLSendmail.make_credentials_dict(json_mail_info=path)
+            self.assertEqual(credentials, {"host": "one", "user": "me@x.org",
+                                           "sender": "me@x.org", "port": 465})
+            # changing the result does not change the cached contents
+            credentials["host"] = "two"
+            self.assertEqual(EasySSLSendmail.make_credentials_dict(json_mail_info=path)["host"],
+                             "one")
+            # rewritten file with the same mtime is read again
+            with open(path, "w") as fp:
+                json.dump({"host": "three"}, fp)
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+            self.assertEqual(EasySSLSendmail.make_credentials_dict(json_mail_info=path)["host"],
+                             "three")
+
+if __name__ == "__main__":
+    unittest.main()
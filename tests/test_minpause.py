@@ -0,0 +1,36 @@
+""" Offline tests for the minpause check of EasySSLSendmail """
+
+import unittest
+from unittest import mock
+
+from fake_smtp import FakeSMTPServer, connect
+
+class TestMinpause(unittest.TestCase):
+
+    def test_suppressed(self):
+        server = FakeSMTPServer()
+        with connect(server, minpause=60) as sendmail:
+            sendmail.send_mail_message("first", "a@y.org", "text")
+            self.assertEqual(sendmail.send_mail_message("second", "a@y.org", "text"), {})
+            # minpause passed as argument overrides the constructor value
+            sendmail.send_mail_message("third", "a@y.org", "text", minpause=0)
+        self.assertEqual(server.subjects(), ["Subject: first", "Subject: third"])
+
+    def test_unthrottled_calls_keep_bucket(self):
+        server = FakeSMTPServer()
+        now = [1000.0]
+        with mock.patch("mailtools_vrb.time.monotonic", lambda: now[0]):
+            with connect(server, minpause=60) as sendmail:
+                sendmail.send_mail_message("first", "a@y.org", "text")
+                now[0] += 30
+                sendmail.send_mail_message("second", "a@y.org", "text")
+                # a call without minpause neither takes a token nor resets the refill time
+                now[0] += 1
+                sendmail.send_mail_message("third", "a@y.org", "text", minpause=0)
+                now[0] += 29
+                sendmail.send_mail_message("fourth", "a@y.org", "text")
+        self.assertEqual(server.subjects(),
+                         ["Subject: first", "Subject: third", "Subject: fourth"])
+
+if __name__ == "__main__":
+    unittest.main()
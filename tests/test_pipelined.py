@@ -0,0 +1,78 @@
+""" Offline tests for EasySSLSendmail.send_pipelined() """
+
+import smtplib, unittest
+
+from fake_smtp import FakeSMTPServer, connect, make_message
+
+class TestSendPipelined(unittest.TestCase):
+
+    def test_partially_refused(self):
+        server = FakeSMTPServer()
+        with connect(server) as sendmail:
+            result = sendmail.send_pipelined([make_message("a@y.org, bad@y.org"),
+                                              make_message("c@y.org")])
+        self.assertEqual(result, [{"bad@y.org": (550, b"no such user")}, {}])
+        commands = server.commands()
+        start = commands.index("MAIL FROM:<me@x.org>")
+        self.assertEqual(commands[start:start + 4], [
+            "MAIL FROM:<me@x.org>", "RCPT TO:<a@y.org>", "RCPT TO:<bad@y.org>", "DATA"])
+        # leading dot is quoted
+        self.assertIn("..leading dot", server.log)
+
+    def test_all_refused(self):
+        server = FakeSMTPServer()
+        with connect(server) as sendmail:
+            with self.assertRaises(smtplib.SMTPRecipientsRefused) as cm:
+                sendmail.send_pipelined([make_message("bad@y.org")])
+            self.assertEqual(list(cm.exception.recipients), ["bad@y.org"])
+            # session is still usable
+            self.assertEqual(sendmail.send_pipelined([make_message("a@y.org")]), [{}])
+        self.assertIn("rset", server.commands())
+
+    def test_data_accepted_anyway(self):
+        server = FakeSMTPServer(data_always_354=True)
+        with connect(server) as sendmail:
+            with self.assertRaises(smtplib.SMTPRecipientsRefused):
+                sendmail.send_pipelined([make_message("bad@y.org")])
+            self.assertEqual(sendmail.send_pipelined([make_message("a@y.org")]), [{}])
+        # the first DATA is terminated without sending the message
+        first_data = server.log.index("DATA")
+        self.assertEqual(server.log[first_data + 1], ".")
+
+    def test_fallback(self):
+        server = FakeSMTPServer(pipelining=False)
+        with connect(server) as sendmail:
+            self.assertEqual(sendmail.send_pipelined([make_message("a@y.org")]), [{}])
+
+    def test_international_address(self):
+        server = FakeSMTPServer()
+        with connect(server) as sendmail:
+            self.assertEqual(sendmail.send_pipelined([make_message("Jörg <jörg@y.org>")]), [{}])
+        self.assertIn("MAIL FROM:<me@x.org> SMTPUTF8 BODY=8BITMIME", server.log)
+        self.assertIn("RCPT TO:<jörg@y.org>", server.log)
+        # QUIT on leaving the with block got its own reply
+        self.assertEqual(server.commands()[-1].lower(), "quit")
+
+    def test_international_address_not_supported(self):
+        server = FakeSMTPServer(smtputf8=False)
+        with connect(server) as sendmail:
+            with self.assertRaises(smtplib.SMTPNotSupportedError):
+                sendmail.send_pipelined([make_message("jörg@y.org")])
+            # nothing has been written, the session is kept
+            self.assertEqual(sendmail.send_pipelined([make_message("a@y.org")]), [{}])
+        self.assertNotIn("RCPT TO:<jörg@y.org>", server.log)
+        self.assertEqual(server.connections, 1)
+
+    def test_error_closes_connection(self):
+        server = FakeSMTPServer()
+        with connect(server) as sendmail:
+            def failing_getreply():
+                raise OSError("simulated network error")
+            sendmail.getreply = failing_getreply
+            with self.assertRaises(OSError):
+                sendmail.send_pipelined([make_message("a@y.org")])
+            # pending replies: the connection is not used any more
+            self.assertIsNone(sendmail.sock)
+
+if __name__ == "__main__":
+    unittest.main()
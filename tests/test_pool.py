@@ -0,0 +1,65 @@
+""" Offline tests for EasySSLSendmailPool """
+
+import smtplib, threading, unittest
+
+from fake_smtp import FakeSMTPServer, PlainSendmail
+
+class BlockingSendmail(PlainSendmail):
+    """ PlainSendmail waiting for release before sending """
+    started = threading.Event()
+    release = threading.Event()
+
+    def send_mail_message(self, *args, **kwargs):
+        self.started.set()
+        self.release.wait(5)
+        return super().send_mail_message(*args, **kwargs)
+
+def make_pool(server: FakeSMTPServer, sendmail_class: type = PlainSendmail, **kwargs):
+    kwargs.setdefault("user", "me@x.org")
+    return sendmail_class.pool(host="127.0.0.1", port=server.port, **kwargs)
+
+class TestPool(unittest.TestCase):
+
+    def test_rotation(self):
+        server = FakeSMTPServer()
+        with make_pool(server, size=2, max_per_conn=2) as pool:
+            for i in range(5):
+                self.assertEqual(pool.send_mail_message(f"mail {i}", "a@y.org", "text"), {})
+        self.assertEqual(server.connections, 3)
+        self.assertEqual(server.log.count("quit"), 3)
+        self.assertEqual([cmd.split(" ")[0] for cmd in server.commands()].count("AUTH"), 3)
+
+    def test_close_while_in_use(self):
+        server = FakeSMTPServer()
+        pool = make_pool(server, BlockingSendmail, size=1)
+        results = []
+        thread = threading.Thread(target=lambda: results.append(
+                                    pool.send_mail_message("in use", "a@y.org", "text")))
+        thread.start()
+        BlockingSendmail.started.wait(5)
+        pool.close()
+        with self.assertRaises(smtplib.SMTPServerDisconnected):
+            pool.send_mail_message("after close", "a@y.org", "text")
+        BlockingSendmail.release.set()
+        thread.join()
+        self.assertEqual(results, [{}])
+        # the returned connection has been closed
+        self.assertEqual(server.log[-1], "quit")
+
+    def test_without_login(self):
+        server = FakeSMTPServer(auth=False)
+        with make_pool(server, size=1, user=None, sender="me@x.org") as pool:
+            self.assertEqual(pool.send_mail_message("Test", "a@y.org", "text"), {})
+        self.assertNotIn("AUTH", [cmd.split(" ")[0] for cmd in server.commands()])
+        self.assertEqual(server.subjects(), ["Subject: Test"])
+
+    def test_shared_minpause(self):
+        server = FakeSMTPServer()
+        with make_pool(server, size=2, minpause=60) as pool:
+            for i in range(3):
+                pool.send_mail_message(f"mail {i}", "a@y.org", "text")
+            pool.send_mail_message("unthrottled", "a@y.org", "text", minpause=0)
+        self.assertEqual(server.subjects(), ["Subject: mail 0", "Subject: unthrottled"])
+
+if __name__ == "__main__":
+    unittest.main()
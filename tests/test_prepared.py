@@ -0,0 +1,40 @@
+""" Offline tests for EasySSLSendmail.prepare_template() and PreparedMessage """
+
+import smtplib, unittest
+
+from fake_smtp import FakeSMTPServer, connect
+
+class TestPreparedMessage(unittest.TestCase):
+
+    def test_send(self):
+        server = FakeSMTPServer()
+        with connect(server) as sendmail:
+            template = sendmail.prepare_template("Grüße", "Me <me@x.org>", "text", html="<p>html</p>")
+            self.assertEqual(template.send("Jö <a@y.org>"), {})
+            self.assertEqual(template.send("b@y.org"), {})
+        self.assertEqual([line for line in server.log if line.startswith("To:")],
+                         ["To: =?utf-8?q?J=C3=B6?= <a@y.org>", "To: b@y.org"])
+        self.assertEqual(server.log.count("Subject: =?utf-8?q?Gr=C3=BC=C3=9Fe?="), 2)
+
+    def test_international_address(self):
+        server = FakeSMTPServer()
+        with connect(server) as sendmail:
+            template = sendmail.prepare_template("Test", "me@x.org", "text")
+            self.assertEqual(template.send("Jörg <jörg@y.org>"), {})
+            self.assertEqual(template.send("a@y.org"), {})
+        self.assertEqual([line for line in server.log if line.startswith("mail")],
+                         ["mail FROM:<me@x.org> SMTPUTF8 BODY=8BITMIME", "mail FROM:<me@x.org>"])
+        self.assertIn("rcpt TO:<jörg@y.org>", server.log)
+        self.assertIn("To: Jörg <jörg@y.org>", server.log)
+
+    def test_international_address_not_supported(self):
+        server = FakeSMTPServer(smtputf8=False)
+        with connect(server) as sendmail:
+            template = sendmail.prepare_template("Test", "me@x.org", "text")
+            with self.assertRaises(smtplib.SMTPNotSupportedError):
+                template.send("jörg@y.org")
+            self.assertEqual(template.send("a@y.org"), {})
+        self.assertEqual(server.connections, 1)
+
+if __name__ == "__main__":
+    unittest.main()
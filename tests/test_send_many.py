@@ -0,0 +1,23 @@
+""" Offline tests for EasySSLSendmail.send_many() """
+
+import unittest
+
+from fake_smtp import FakeSMTPServer, connect
+
+class TestSendMany(unittest.TestCase):
+
+    def test_order(self):
+        server = FakeSMTPServer()
+        with connect(server) as sendmail:
+            results = sendmail.send_many([
+                dict(mail_subject="1", mail_to="a@x.org", mail_text="text"),
+                dict(mail_subject="2", mail_to="a@y.org, bad@y.org", mail_text="text"),
+                dict(mail_subject="3", mail_to="B <b@X.org>", mail_text="text"),
+            ])
+        # results in input order, mails grouped by domain
+        self.assertEqual(results, [{}, {"bad@y.org": (550, b"no such user")}, {}])
+        self.assertEqual(server.subjects(), ["Subject: 1", "Subject: 3", "Subject: 2"])
+        self.assertEqual(server.connections, 1)
+
+if __name__ == "__main__":
+    unittest.main()
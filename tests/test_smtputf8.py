@@ -0,0 +1,28 @@
+""" Offline tests for SMTPUTF8 handling in EasySSLSendmail.send_mail_message() """
+
+import smtplib, unittest
+
+from fake_smtp import FakeSMTPServer, connect
+
+class TestSMTPUTF8(unittest.TestCase):
+
+    def test_international_address(self):
+        server = FakeSMTPServer()
+        with connect(server) as sendmail:
+            self.assertEqual(sendmail.send_mail_message("Grüße", "Jörg <jörg@y.org>", "text"), {})
+        self.assertIn("mail FROM:<me@x.org> SMTPUTF8 BODY=8BITMIME", server.log)
+        self.assertIn("rcpt TO:<jörg@y.org>", server.log)
+        self.assertIn("To: Jörg <jörg@y.org>", server.log)
+
+    def test_not_supported(self):
+        server = FakeSMTPServer(smtputf8=False)
+        with connect(server) as sendmail:
+            with self.assertRaises(smtplib.SMTPNotSupportedError):
+                sendmail.send_mail_message("Grüße", "jörg@y.org", "text")
+            # no transaction has been started, the session is kept
+            self.assertIsNotNone(sendmail.sock)
+            self.assertEqual(sendmail.send_mail_message("Test", "a@y.org", "text"), {})
+        self.assertEqual(server.connections, 1)
+
+if __name__ == "__main__":
+    unittest.main()